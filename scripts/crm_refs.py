@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Reverse-reference graph of CRM records: what references an ID, and batched
+rename/merge of IDs across every file that points at them.
+
+Edges come from foreign_keys in schema.yaml plus the foreign keys that
+validate_csv.py enforces. The graph is built in one pass over all tables;
+after that "what references X" is a dict lookup.
+
+Usage:
+    python3 scripts/crm_refs.py refs comp-acme p-delta-1
+    python3 scripts/crm_refs.py rename comp-acme comp-acme-corp
+    python3 scripts/crm_refs.py merge p-acme-1 p-acme-2          # Repoint p-acme-1 to p-acme-2, drop p-acme-1
+    python3 scripts/crm_refs.py rename --map renames.csv        # Bulk: CSV with old_id,new_id columns
+    python3 scripts/crm_refs.py merge --map duplicates.csv --dry-run
+"""
+
+import argparse
+import sys
+from collections import Counter
+
+import pandas as pd
+
+from crm_schema import load_schema, primary_key, table_names, table_path
+from validate_csv import ID_PATTERNS, today_iso
+
+
+# Foreign keys checked in validate_csv.py, as (source table, column, target table)
+VALIDATOR_FOREIGN_KEYS = [
+    ("people", "company_id", "companies"),
+    ("activities", "person_id", "people"),
+    ("activities", "company_id", "companies"),
+    ("activities", "product_id", "products"),
+    ("leads", "company_id", "companies"),
+    ("leads", "product_id", "products"),
+    ("leads", "primary_contact_id", "people"),
+    ("clients", "company_id", "companies"),
+    ("clients", "product_id", "products"),
+    ("clients", "primary_contact_id", "people"),
+    ("partners", "company_id", "companies"),
+    ("partners", "product_id", "products"),
+    ("partners", "primary_contact_id", "people"),
+    ("deals", "client_id", "clients"),
+]
+
+
+def foreign_keys() -> list[tuple]:
+    """All (source table, column, target table) edges, schema first."""
+    edges = []
+    for table, spec in load_schema()["tables"].items():
+        for column, target in (spec.get("foreign_keys") or {}).items():
+            edges.append((table, column, target.split(".", 1)[0]))
+    for edge in VALIDATOR_FOREIGN_KEYS:
+        if edge not in edges:
+            edges.append(edge)
+    return edges
+
+
+def load_raw(table: str) -> pd.DataFrame:
+    """Load a table as plain strings so rewriting it changes nothing but the IDs."""
+    path = table_path(table)
+    if not path.exists():
+        return pd.DataFrame()
+    try:
+        return pd.read_csv(path, dtype=str, keep_default_na=False)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
+
+
+def write_raw(table: str, df: pd.DataFrame) -> None:
+    """Write a table back, keeping the file's existing line endings."""
+    path = table_path(table)
+    newline = "\n"
+    if path.exists():
+        with open(path, "rb") as f:
+            if f.readline().endswith(b"\r\n"):
+                newline = "\r\n"
+    df.to_csv(path, index=False, lineterminator=newline)
+
+
+def table_for_id(value: str):
+    """Infer which table an ID belongs to from its format."""
+    for table in table_names():
+        pattern = ID_PATTERNS.get(primary_key(table))
+        if pattern and pattern.match(value):
+            return table
+    return None
+
+
+class ReferenceGraph:
+    """Reverse index: (target table, id) -> [(source table, row index, column)]."""
+
+    def __init__(self, frames: dict = None):
+        self.frames = frames if frames is not None else {t: load_raw(t) for t in table_names()}
+        self.ids = {}
+        self.refs = {}
+
+        for table, df in self.frames.items():
+            pk = primary_key(table)
+            self.ids[table] = set(df[pk]) - {""} if pk in df.columns else set()
+
+        for source, column, target in foreign_keys():
+            df = self.frames.get(source)
+            if df is None or df.empty or column not in df.columns:
+                continue
+            for idx, value in df[column].items():
+                if value:
+                    self.refs.setdefault((target, value), []).append((source, idx, column))
+
+    def exists(self, table: str, value: str) -> bool:
+        return value in self.ids.get(table, set())
+
+    def referencing(self, table: str, value: str) -> list[tuple]:
+        return self.refs.get((table, value), [])
+
+    def describe(self, table: str, value: str) -> list[str]:
+        """Human-readable 'source/pk.column' list of rows that reference an ID."""
+        lines = []
+        for source, idx, column in self.referencing(table, value):
+            pk = primary_key(source)
+            df = self.frames[source]
+            label = df.at[idx, pk] if pk in df.columns and df.at[idx, pk] else f"row {idx + 2}"
+            lines.append(f"{source}/{label}.{column}")
+        return lines
+
+
+def plan_remap(graph: ReferenceGraph, mapping: dict, merge: bool) -> list[str]:
+    """Check a rename/merge mapping before anything is written."""
+    errors = []
+    if not merge:
+        for new, count in Counter(mapping.values()).items():
+            if count > 1:
+                olds = ", ".join(old for old, target in mapping.items() if target == new)
+                errors.append(f"{olds} -> {new}: several IDs renamed to one (use merge)")
+    for old, new in mapping.items():
+        table = table_for_id(old)
+        if table is None:
+            errors.append(f"{old}: unknown ID format")
+            continue
+        if table_for_id(new) != table:
+            errors.append(f"{old} -> {new}: IDs belong to different tables")
+            continue
+        pattern = ID_PATTERNS.get(primary_key(table))
+        if pattern and not pattern.match(new):
+            errors.append(f"{new}: does not match expected format {pattern.pattern}")
+        if not graph.exists(table, old):
+            errors.append(f"{old}: not found in {table}")
+        if new in mapping:
+            errors.append(f"{old} -> {new}: chained remap, map {old} to the final ID instead")
+        if merge and not graph.exists(table, new):
+            errors.append(f"{new}: merge target not found in {table}")
+        if not merge and graph.exists(table, new):
+            errors.append(f"{new}: already exists in {table} (use merge)")
+    return errors
+
+
+def apply_remap(graph: ReferenceGraph, mapping: dict, merge: bool, dry_run: bool = False) -> dict:
+    """Rewrite IDs everywhere they appear, writing each affected file once.
+
+    Returns {table: number of rows changed or removed}.
+    """
+    touched = {}
+    dropped = {}
+
+    for old, new in mapping.items():
+        table = table_for_id(old)
+        for source, idx, column in graph.referencing(table, old):
+            graph.frames[source].at[idx, column] = new
+            touched.setdefault(source, set()).add(idx)
+
+        df = graph.frames[table]
+        pk = primary_key(table)
+        rows = df.index[df[pk] == old]
+        if merge:
+            dropped.setdefault(table, set()).update(rows)
+        else:
+            df.loc[rows, pk] = new
+            touched.setdefault(table, set()).update(rows)
+
+    summary = {}
+    today = today_iso()
+    for table in set(touched) | set(dropped):
+        df = graph.frames[table]
+        changed = touched.get(table, set()) - dropped.get(table, set())
+        if changed and "last_updated" in df.columns:
+            df.loc[sorted(changed), "last_updated"] = today
+        if dropped.get(table):
+            df = df.drop(index=sorted(dropped[table]))
+            graph.frames[table] = df
+        summary[table] = len(changed) + len(dropped.get(table, ()))
+        if not dry_run:
+            write_raw(table, df)
+    return summary
+
+
+def read_mapping(args) -> dict:
+    if args.map:
+        df = pd.read_csv(args.map, dtype=str, keep_default_na=False)
+        return {row.old_id.strip(): row.new_id.strip() for row in df.itertuples(index=False)
+                if row.old_id.strip() and row.new_id.strip()}
+    if args.old and args.new:
+        return {args.old: args.new}
+    return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find and rewrite references between CRM records")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    refs = sub.add_parser("refs", help="List rows that reference the given IDs")
+    refs.add_argument("ids", nargs="+")
+
+    for name, help_text in (("rename", "Rename IDs everywhere"),
+                            ("merge", "Repoint references to another existing ID and drop the old record")):
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument("old", nargs="?")
+        cmd.add_argument("new", nargs="?")
+        cmd.add_argument("--map", help="CSV with old_id,new_id columns for bulk changes")
+        cmd.add_argument("--dry-run", action="store_true", help="Show what would change, write nothing")
+
+    args = parser.parse_args()
+    graph = ReferenceGraph()
+
+    if args.command == "refs":
+        status = 0
+        for value in args.ids:
+            table = table_for_id(value)
+            if table is None:
+                print(f"{value}: unknown ID format")
+                status = 1
+                continue
+            found = "" if graph.exists(table, value) else " (not found)"
+            lines = graph.describe(table, value)
+            print(f"{value} [{table}]{found}: {len(lines)} references")
+            for line in lines:
+                print(f"     - {line}")
+        return status
+
+    mapping = read_mapping(args)
+    if not mapping:
+        parser.error(f"{args.command} needs OLD NEW or --map FILE")
+    merge = args.command == "merge"
+
+    errors = plan_remap(graph, mapping, merge)
+    if errors:
+        print(f"{len(errors)} issues, nothing written:")
+        for e in errors:
+            print(f"     - {e}")
+        return 1
+
+    summary = apply_remap(graph, mapping, merge, dry_run=args.dry_run)
+    verb = "Would update" if args.dry_run else "Updated"
+    print(f"{verb} {len(mapping)} IDs:")
+    for table, count in sorted(summary.items()):
+        print(f"     - {table}: {count} rows")
+    if not args.dry_run:
+        print("Run scripts/validate_csv.py to double-check uniqueness after a merge.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Shared access to sales/crm/schema.yaml, CRM paths and the .crm_cache helpers
+for the CRM scripts.
+"""
+
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+import yaml
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CRM_DIR = BASE_DIR / "sales" / "crm"
+SCHEMA_PATH = CRM_DIR / "schema.yaml"
+
+# Derived indexes and caches live here (git-ignored)
+CACHE_DIR = BASE_DIR / ".crm_cache"
+
+
+@lru_cache(maxsize=None)
+def load_schema() -> dict:
+    """Load and cache schema.yaml."""
+    with open(SCHEMA_PATH, encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def table_names() -> list[str]:
+    return list(load_schema()["tables"])
+
+
+def table_spec(table: str) -> dict:
+    return load_schema()["tables"][table]
+
+
+def table_path(table: str) -> Path:
+    return CRM_DIR / table_spec(table)["file"]
+
+
+def primary_key(table: str) -> str:
+    return table_spec(table)["primary_key"]
+
+
+def file_stamp(path: Path):
+    """[mtime_ns, size] of a file, or None if it does not exist."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Replace a file in one step via a temp file unique to this process, so
+    concurrent runs never rename away each other's half-written files."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp",
+                                     delete=False) as f:
+        tmp_name = f.name
+    try:
+        with open(tmp_name, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
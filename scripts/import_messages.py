@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""
+Bulk-import exported channel messages into activities.csv.
+
+Reads local export files instead of fetching messages one by one:
+    mbox      -- Gmail Takeout / any mbox mailbox
+    telegram  -- Telegram Desktop JSON export (result.json, single chat or full)
+    whatsapp  -- WhatsApp "Export chat" .txt file
+
+Senders are resolved to person_id / company_id through email, phone and
+telegram_username indexes built once from people.csv (emails fall back to
+the company whose website matches the domain). Messages already logged are
+skipped by fingerprint, so re-running an import is safe. Messages that are
+not imported (empty, bad date, unknown sender) are counted in the report.
+
+Usage:
+    python3 scripts/import_messages.py mbox ~/Takeout/Mail/All.mbox --me me@mycompany.com
+    python3 scripts/import_messages.py telegram result.json --me "Alex" --contact @mikejbw
+    python3 scripts/import_messages.py whatsapp chat.txt --me "Alex" --contact "Hans=+49-555-0201"
+    python3 scripts/import_messages.py whatsapp chat.txt --me "Alex" --dry-run
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import mailbox
+import re
+import sys
+from collections import Counter
+from datetime import datetime
+from email.header import decode_header, make_header
+from email.utils import getaddresses, parseaddr, parsedate_to_datetime
+from pathlib import Path
+
+import pandas as pd
+
+from crm_schema import CRM_DIR
+from validate_csv import EMAIL_PATTERN, FORMULA_INJECTION_CHARS, load_csv
+
+
+ACTIVITIES_PATH = CRM_DIR / "activities.csv"
+ACTIVITY_COLUMNS = [
+    "activity_id", "person_id", "company_id", "product_id", "type", "channel",
+    "direction", "subject", "notes", "date", "created_by",
+]
+ACTIVITY_ID_PATTERN = re.compile(r"^act-(\d+)$")
+
+# Export format -> (activity type, activity channel)
+SOURCES = {
+    "mbox": ("email", "email"),
+    "telegram": ("message", "telegram"),
+    "whatsapp": ("message", "whatsapp"),
+}
+
+SUBJECT_MAX = 80
+NOTES_MAX = 500
+DEFAULT_BATCH_SIZE = 5000
+
+# "31/12/2023, 22:15 - " (Android) or "[31.12.23, 22:15:03] " (iOS)
+WHATSAPP_LINE = re.compile(
+    r"^\u200e?\[?(?P<date>\d{1,4}[./-]\d{1,2}[./-]\d{1,4}),? "
+    r"(?P<time>\d{1,2}:\d{2}(?::\d{2})?(?:\s?[APap]\.?[Mm]\.?)?)\]?(?: -)? "
+    r"(?P<rest>.*)$"
+)
+
+
+# ---------------------------------------------------------------------------
+# Normalization
+# ---------------------------------------------------------------------------
+
+def normalize_email(value) -> str:
+    return str(value).strip().lower()
+
+
+def normalize_phone(value) -> str:
+    """Keep digits only so '+1-555-0101' and '+1 555 0101' compare equal."""
+    return re.sub(r"\D", "", str(value))
+
+
+def normalize_telegram(value) -> str:
+    return str(value).strip().lstrip("@").lower()
+
+
+def normalize_domain(url) -> str:
+    host = re.sub(r"^[a-z]+://", "", str(url).strip().lower())
+    host = host.split("/", 1)[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+def clean_text(value, limit: int) -> str:
+    """Collapse whitespace, truncate, and neutralize CSV formula prefixes."""
+    s = " ".join(str(value).split())
+    if len(s) > limit:
+        s = s[: limit - 3].rstrip() + "..."
+    if s and s[0] in FORMULA_INJECTION_CHARS:
+        s = "'" + s
+    return s
+
+
+# ---------------------------------------------------------------------------
+# Sender resolution
+# ---------------------------------------------------------------------------
+
+def build_indexes(people_df, companies_df) -> dict:
+    """Build handle -> (person_id, company_id) lookups from people/companies."""
+    indexes = {"email": {}, "phone": {}, "telegram": {}, "domain": {}}
+
+    if not people_df.empty and "person_id" in people_df.columns:
+        for row in people_df.itertuples(index=False):
+            pid = getattr(row, "person_id", None)
+            if pd.isna(pid):
+                continue
+            cid = getattr(row, "company_id", None)
+            target = (pid, cid if pd.notna(cid) else "")
+            email = getattr(row, "email", None)
+            if pd.notna(email) and str(email).strip():
+                indexes["email"].setdefault(normalize_email(email), target)
+            phone = getattr(row, "phone", None)
+            if pd.notna(phone) and normalize_phone(phone):
+                indexes["phone"].setdefault(normalize_phone(phone), target)
+            tg = getattr(row, "telegram_username", None)
+            if pd.notna(tg) and normalize_telegram(tg):
+                indexes["telegram"].setdefault(normalize_telegram(tg), target)
+
+    if not companies_df.empty and "website" in companies_df.columns:
+        for row in companies_df.itertuples(index=False):
+            website = getattr(row, "website", None)
+            if pd.notna(website) and str(website).strip():
+                indexes["domain"].setdefault(normalize_domain(website), ("", row.company_id))
+
+    return indexes
+
+
+def resolve_handle(handle: str, indexes: dict):
+    """Resolve an email, phone number or Telegram username to (person_id, company_id)."""
+    if not handle:
+        return None
+    handle = str(handle).strip()
+
+    if EMAIL_PATTERN.match(handle):
+        email = normalize_email(handle)
+        if email in indexes["email"]:
+            return indexes["email"][email]
+        return indexes["domain"].get(email.rsplit("@", 1)[1])
+
+    digits = normalize_phone(handle)
+    if len(digits) >= 7 and re.fullmatch(r"[\d\s()+.-]+", handle):
+        return indexes["phone"].get(digits)
+
+    return indexes["telegram"].get(normalize_telegram(handle))
+
+
+def parse_contact_args(values: list[str]) -> tuple[str, dict]:
+    """Split --contact values into a default handle and a NAME=HANDLE map."""
+    default = ""
+    by_name = {}
+    for value in values or []:
+        if "=" in value:
+            name, handle = value.split("=", 1)
+            by_name[name.strip().lower()] = handle.strip()
+        else:
+            default = value.strip()
+    return default, by_name
+
+
+# ---------------------------------------------------------------------------
+# Export parsers -- each yields dicts with
+#   direction, date (YYYY-MM-DD, "" if unparseable), handle, name, subject,
+#   text, source_id (message ID or timestamp, unique within the export)
+# ---------------------------------------------------------------------------
+
+def decode_mime_header(value) -> str:
+    if not value:
+        return ""
+    try:
+        return str(make_header(decode_header(value)))
+    except (UnicodeDecodeError, LookupError):
+        return str(value)
+
+
+def email_body(msg) -> str:
+    """Return the first text/plain part of an email message."""
+    parts = msg.walk() if msg.is_multipart() else [msg]
+    for part in parts:
+        if part.get_content_type() != "text/plain" or part.get_filename():
+            continue
+        payload = part.get_payload(decode=True)
+        if payload is None:
+            continue
+        charset = part.get_content_charset() or "utf-8"
+        try:
+            return payload.decode(charset, errors="replace")
+        except LookupError:
+            return payload.decode("utf-8", errors="replace")
+    return ""
+
+
+def parse_mbox(path: Path, me: set[str], default_contact: str, contacts: dict):
+    for msg in mailbox.mbox(str(path), create=False):
+        try:
+            date = parsedate_to_datetime(msg["Date"]).strftime("%Y-%m-%d")
+        except (TypeError, ValueError, IndexError):
+            date = ""
+
+        from_name, from_addr = parseaddr(msg.get("From", ""))
+        from_addr = normalize_email(from_addr)
+        if from_addr in me:
+            recipients = getaddresses(msg.get_all("To", []) + msg.get_all("Cc", []))
+            others = [(n, a) for n, a in recipients if a and normalize_email(a) not in me]
+            name, handle = others[0] if others else ("(no external recipient)", "")
+            direction = "outbound"
+        else:
+            name, handle = from_name, from_addr
+            direction = "inbound"
+
+        subject = decode_mime_header(msg.get("Subject"))
+        source_id = str(msg.get("Message-ID") or "").strip() or f"{msg.get('Date')}|{from_addr}|{subject}"
+        yield {
+            "direction": direction,
+            "date": date,
+            "handle": contacts.get(name.strip().lower(), handle) if handle else "",
+            "name": name,
+            "subject": subject,
+            "text": email_body(msg),
+            "source_id": source_id,
+        }
+
+
+def telegram_text(value) -> str:
+    """Telegram exports store formatted text as a list of strings and entities."""
+    if isinstance(value, list):
+        return "".join(part if isinstance(part, str) else part.get("text", "") for part in value)
+    return value or ""
+
+
+def parse_telegram(path: Path, me: set[str], default_contact: str, contacts: dict):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    chats = [chat for chat in (data["chats"]["list"] if "chats" in data else [data])
+             if chat.get("type") == "personal_chat"]
+    if default_contact and len(chats) > 1:
+        raise ValueError(
+            f"--contact {default_contact} would apply to all {len(chats)} chats in this export; "
+            'map each chat with --contact "NAME=HANDLE" instead'
+        )
+    for chat in chats:
+        chat_name = chat.get("name") or ""
+        handle = contacts.get(chat_name.strip().lower(), default_contact or chat_name)
+
+        for message in chat.get("messages", []):
+            if message.get("type") != "message":
+                continue
+            text = telegram_text(message.get("text"))
+            sender = {str(message.get("from") or "").lower(), str(message.get("from_id") or "").lower()}
+            yield {
+                "direction": "outbound" if sender & me else "inbound",
+                "date": str(message.get("date", ""))[:10],
+                "handle": handle,
+                "name": chat_name,
+                "subject": "",
+                "text": text,
+                "source_id": f"{chat.get('id')}:{message.get('id')}",
+            }
+
+
+def parse_whatsapp_date(value: str, date_order: str) -> str:
+    parts = [int(p) for p in re.split(r"[./-]", value)]
+    if parts[0] > 31:
+        year, month, day = parts
+    elif date_order == "mdy":
+        month, day, year = parts
+    else:
+        day, month, year = parts
+    if year < 100:
+        year += 2000
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+def parse_whatsapp(path: Path, me: set[str], default_contact: str, contacts: dict,
+                   date_order: str = "dmy"):
+    # The counterparty of a 1:1 chat is the first sender that is not "me";
+    # our own messages before their first reply wait in `pending` until then
+    counterparty = ""
+    pending = []
+    current = None
+    stamps = Counter()
+
+    def to_message(entry):
+        is_me = entry["sender"].lower() in me
+        name = counterparty if is_me else entry["sender"]
+        return {
+            "direction": "outbound" if is_me else "inbound",
+            "date": entry["date"],
+            "handle": contacts.get(name.strip().lower(), default_contact or name) if name else default_contact,
+            "name": name,
+            "subject": "",
+            "text": entry["text"],
+            "source_id": entry["source_id"],
+        }
+
+    def release(entry, final=False):
+        if entry is not None:
+            pending.append(entry)
+        if counterparty or default_contact or final:
+            for e in pending:
+                yield to_message(e)
+            pending.clear()
+
+    with open(path, encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            match = WHATSAPP_LINE.match(line)
+            if not match:
+                if current is not None:
+                    current["text"] += "\n" + line
+                continue
+
+            yield from release(current)
+            current = None
+
+            sender, sep, text = match.group("rest").partition(": ")
+            if not sep:
+                continue  # system line, e.g. "Messages are end-to-end encrypted"
+            try:
+                date = parse_whatsapp_date(match.group("date"), date_order)
+            except ValueError:
+                date = ""
+            sender = sender.strip()
+            if sender.lower() not in me and not counterparty:
+                counterparty = sender
+            if text.strip() in ("<Media omitted>", "<attached: omitted>"):
+                text = ""
+            # Exports have minute (Android) or second (iOS) precision, so number
+            # repeats of the same stamp to keep quick successive messages apart
+            stamp = f"{match.group('date')} {match.group('time')} {sender}"
+            stamps[stamp] += 1
+            current = {"sender": sender, "date": date, "text": text,
+                       "source_id": f"{stamp} #{stamps[stamp]}"}
+
+    yield from release(current, final=True)
+
+
+PARSERS = {
+    "mbox": parse_mbox,
+    "telegram": parse_telegram,
+    "whatsapp": parse_whatsapp,
+}
+
+
+# ---------------------------------------------------------------------------
+# Activity rows
+# ---------------------------------------------------------------------------
+
+def fingerprint(row: dict, source_id: str = "") -> str:
+    """Identity of a logged message, independent of its activity_id.
+
+    activities.csv has no message-ID column, so logged rows are matched on
+    content alone; within one export, source_id (message ID or timestamp)
+    keeps identical messages such as two "ok"s on the same day apart.
+    """
+    key = "\x1f".join(
+        [str(row.get(field) or "")
+         for field in ("channel", "direction", "date", "person_id", "company_id", "subject", "notes")]
+        + [source_id]
+    )
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def existing_state(df) -> tuple[Counter, int]:
+    """Return content fingerprints of logged activities (with counts) and the highest act-N number."""
+    if df.empty:
+        return Counter(), 0
+    df = df.fillna("")
+    fingerprints = Counter(fingerprint(row) for row in df.to_dict("records"))
+    last_id = 0
+    for aid in df.get("activity_id", []):
+        match = ACTIVITY_ID_PATTERN.match(str(aid))
+        if match:
+            last_id = max(last_id, int(match.group(1)))
+    return fingerprints, last_id
+
+
+def build_row(message: dict, target: tuple, source: str, created_by: str) -> dict:
+    atype, channel = SOURCES[source]
+    text = message["text"]
+    subject = message["subject"]
+    if not subject and text.strip():
+        subject = text.strip().splitlines()[0]
+    return {
+        "person_id": target[0],
+        "company_id": target[1],
+        "product_id": "",
+        "type": atype,
+        "channel": channel,
+        "direction": message["direction"],
+        "subject": clean_text(subject, SUBJECT_MAX),
+        "notes": clean_text(text, NOTES_MAX),
+        "date": message["date"],
+        "created_by": created_by,
+    }
+
+
+def validate_row(row: dict, valid_people: set, valid_companies: set) -> bool:
+    """Cheap per-row check so a bad export never lands in activities.csv."""
+    try:
+        datetime.strptime(row["date"], "%Y-%m-%d")
+    except ValueError:
+        return False
+    if row["person_id"] and row["person_id"] not in valid_people:
+        return False
+    if row["company_id"] and row["company_id"] not in valid_companies:
+        return False
+    return bool(row["person_id"] or row["company_id"]) and bool(row["created_by"])
+
+
+def append_batch(rows: list[dict], columns: list[str]) -> None:
+    """Append rows to activities.csv in one write."""
+    new_file = not ACTIVITIES_PATH.exists() or ACTIVITIES_PATH.stat().st_size == 0
+    if not new_file:
+        with open(ACTIVITIES_PATH, "rb") as f:
+            f.seek(-1, 2)
+            needs_newline = f.read(1) != b"\n"
+    with open(ACTIVITIES_PATH, "a", newline="", encoding="utf-8") as f:
+        if not new_file and needs_newline:
+            f.write("\n")
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore", lineterminator="\n")
+        if new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def import_messages(source: str, path: Path, me: list[str], contact_args: list[str],
+                    created_by: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                    dry_run: bool = False, date_order: str = "dmy") -> dict:
+    """Parse an export, resolve senders and append new activities in batches."""
+    people_df = load_csv(CRM_DIR / "contacts" / "people.csv")
+    companies_df = load_csv(CRM_DIR / "contacts" / "companies.csv")
+    activities_df = load_csv(ACTIVITIES_PATH) if ACTIVITIES_PATH.exists() else pd.DataFrame()
+
+    indexes = build_indexes(people_df, companies_df)
+    valid_people = set(people_df["person_id"].dropna()) if "person_id" in people_df.columns else set()
+    valid_companies = set(companies_df["company_id"].dropna()) if "company_id" in companies_df.columns else set()
+    logged, last_id = existing_state(activities_df)
+    seen = set()  # fingerprint + source_id of messages handled in this run
+    columns = list(activities_df.columns) if not activities_df.empty else ACTIVITY_COLUMNS
+
+    me_set = {m.strip().lower() for m in me}
+    default_contact, contacts = parse_contact_args(contact_args)
+    if default_contact and source == "mbox":
+        raise ValueError(
+            f"--contact {default_contact} would apply to every correspondent in the mailbox; "
+            'use --contact "NAME=HANDLE" to map display names'
+        )
+    kwargs = {"date_order": date_order} if source == "whatsapp" else {}
+
+    stats = {"read": 0, "imported": 0, "duplicates": 0, "empty": 0, "unresolved": 0, "invalid": 0}
+    unresolved = {}
+    resolved_cache = {}
+    batch = []
+
+    for message in PARSERS[source](path, me_set, default_contact, contacts, **kwargs):
+        stats["read"] += 1
+        if not (message["text"].strip() or message["subject"].strip()):
+            stats["empty"] += 1  # media-only or blank
+            continue
+        if not message["date"]:
+            stats["invalid"] += 1  # missing or unparseable date
+            continue
+        handle = message["handle"]
+        if handle not in resolved_cache:
+            resolved_cache[handle] = resolve_handle(handle, indexes)
+        target = resolved_cache[handle]
+        if target is None:
+            stats["unresolved"] += 1
+            label = handle or message["name"] or "(unknown)"
+            unresolved[label] = unresolved.get(label, 0) + 1
+            continue
+
+        row = build_row(message, target, source, created_by)
+        if not validate_row(row, valid_people, valid_companies):
+            stats["invalid"] += 1
+            continue
+
+        # Each logged row can absorb one matching message; the rest are new
+        # unless this export already contained the very same message
+        message_fp = fingerprint(row, message["source_id"])
+        content_fp = fingerprint(row)
+        if message_fp in seen:
+            stats["duplicates"] += 1
+            continue
+        seen.add(message_fp)
+        if logged[content_fp] > 0:
+            logged[content_fp] -= 1
+            stats["duplicates"] += 1
+            continue
+
+        last_id += 1
+        row["activity_id"] = f"act-{last_id:03d}"
+        batch.append(row)
+        if len(batch) >= batch_size:
+            if not dry_run:
+                append_batch(batch, columns)
+            stats["imported"] += len(batch)
+            batch = []
+
+    if batch:
+        if not dry_run:
+            append_batch(batch, columns)
+        stats["imported"] += len(batch)
+
+    stats["unresolved_handles"] = sorted(unresolved.items(), key=lambda kv: -kv[1])
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import exported messages into activities.csv")
+    parser.add_argument("source", choices=sorted(SOURCES), help="Export format")
+    parser.add_argument("path", type=Path, help="Export file (mbox, result.json or chat .txt)")
+    parser.add_argument("--me", action="append", default=[], required=True,
+                        help="Your own email / display name / Telegram from_id (repeatable)")
+    parser.add_argument("--contact", action="append", default=[],
+                        help="Counterparty handle for a single-chat export (email, phone or @username), "
+                             "or NAME=HANDLE to map a display name (repeatable)")
+    parser.add_argument("--created-by", default="import", help="Value for created_by (default: import)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Rows per append (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--date-order", choices=["dmy", "mdy"], default="dmy",
+                        help="Date order of WhatsApp exports (default: dmy)")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be imported, write nothing")
+    args = parser.parse_args()
+
+    if not args.path.exists():
+        print(f"{args.path} not found")
+        return 1
+
+    try:
+        stats = import_messages(
+            args.source, args.path, args.me, args.contact, args.created_by,
+            batch_size=args.batch_size, dry_run=args.dry_run, date_order=args.date_order,
+        )
+    except ValueError as e:
+        print(e)
+        return 1
+
+    print("=" * 50)
+    print("MESSAGE IMPORT" + (" (dry run)" if args.dry_run else ""))
+    print("=" * 50)
+    print(f"  Messages read:      {stats['read']}")
+    print(f"  Imported:           {stats['imported']}")
+    print(f"  Already logged:     {stats['duplicates']}")
+    print(f"  Empty / media only: {stats['empty']}")
+    print(f"  Unresolved sender:  {stats['unresolved']}")
+    print(f"  Invalid rows:       {stats['invalid']}")
+    if stats["unresolved_handles"]:
+        print("\nTop unresolved senders (add them to people.csv or map with --contact):")
+        for handle, count in stats["unresolved_handles"][:10]:
+            print(f"     - {handle}: {count}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
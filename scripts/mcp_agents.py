@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Cached discovery of MCP agent descriptors (/.well-known/agent.json).
+
+Collects every mcp_url from companies.csv and people.csv, validates it, and
+refreshes the matching agent.json files concurrently (asyncio, bounded
+concurrency). Descriptors are stored in .crm_cache/agents.json with their
+ETag / Last-Modified and an expiry taken from Cache-Control max-age, so
+refreshes are conditional requests and capability lookups read the cache
+only -- they never touch the network.
+
+Usage:
+    python3 scripts/mcp_agents.py check                     # Validate mcp_url values only
+    python3 scripts/mcp_agents.py refresh                   # Fetch expired descriptors
+    python3 scripts/mcp_agents.py refresh --force --concurrency 16
+    python3 scripts/mcp_agents.py show                      # Cached capabilities per contact
+    python3 scripts/mcp_agents.py show comp-acme
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+from crm_schema import CACHE_DIR, atomic_write, primary_key, table_path
+from validate_csv import load_csv
+
+
+CACHE_PATH = CACHE_DIR / "agents.json"
+AGENT_JSON_PATH = "/.well-known/agent.json"
+MCP_TABLES = ["companies", "people"]
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 10
+DEFAULT_TTL = 24 * 3600
+MIN_TTL = 5 * 60
+MAX_TTL = 7 * 24 * 3600
+ERROR_TTL = 3600
+MAX_BYTES = 1024 * 1024
+
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+
+# ---------------------------------------------------------------------------
+# mcp_url validation
+# ---------------------------------------------------------------------------
+
+def validate_mcp_url(value: str) -> list[str]:
+    """Check that an mcp_url is a well-formed endpoint URL."""
+    errors = []
+    s = str(value).strip()
+    if s != str(value) or any(c.isspace() for c in s):
+        errors.append("contains whitespace")
+    try:
+        parts = urlsplit(s)
+        parts.port  # raises ValueError for a non-numeric or out-of-range port
+    except ValueError:
+        return errors + ["invalid URL"]
+    if parts.scheme not in ("https", "http"):
+        errors.append("must start with https://")
+    elif parts.scheme == "http" and parts.hostname not in LOCAL_HOSTS:
+        errors.append("must use https:// (http:// only for localhost)")
+    if not parts.hostname:
+        errors.append("missing host")
+    if parts.query or parts.fragment:
+        errors.append("must not have a query string or fragment")
+    if not s.endswith("/"):
+        errors.append("must end with '/'")
+    return errors
+
+
+def agent_json_url(mcp_url: str) -> str:
+    """Discovery document lives at the origin of the MCP endpoint."""
+    parts = urlsplit(mcp_url.strip())
+    return f"{parts.scheme}://{parts.netloc}{AGENT_JSON_PATH}"
+
+
+def collect_mcp_urls() -> tuple[dict, list[str]]:
+    """Return ({agent.json url: [(table, id, mcp_url)]}, validation errors)."""
+    targets = {}
+    errors = []
+    for table in MCP_TABLES:
+        path = table_path(table)
+        df = load_csv(path) if path.exists() else pd.DataFrame()
+        if df.empty or "mcp_url" not in df.columns:
+            continue
+        pk = primary_key(table)
+        for i, row in df.iterrows():
+            url = row.get("mcp_url")
+            if pd.isna(url) or not str(url).strip():
+                continue
+            problems = validate_mcp_url(url)
+            if problems:
+                errors.append(f"{table} row {i + 2} ({row.get(pk)}): mcp_url '{url}' {', '.join(problems)}")
+                continue
+            targets.setdefault(agent_json_url(url), []).append((table, row.get(pk), url))
+    return targets, errors
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+def load_cache() -> dict:
+    if CACHE_PATH.exists():
+        try:
+            with open(CACHE_PATH, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {}
+
+
+def save_cache(cache: dict) -> None:
+    atomic_write(CACHE_PATH, json.dumps(cache, indent=2, sort_keys=True).encode("utf-8"))
+
+
+def ttl_from_headers(headers) -> int:
+    cache_control = (headers.get("Cache-Control") or "") if headers else ""
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return MIN_TTL
+    match = MAX_AGE_PATTERN.search(cache_control)
+    ttl = int(match.group(1)) if match else DEFAULT_TTL
+    return max(MIN_TTL, min(ttl, MAX_TTL))
+
+
+def is_fresh(entry: dict, now: float) -> bool:
+    return bool(entry) and entry.get("expires_at", 0) > now
+
+
+def validate_descriptor(data) -> list[str]:
+    """Minimal shape check of an agent.json document."""
+    if not isinstance(data, dict):
+        return ["agent.json is not a JSON object"]
+    errors = []
+    if not data.get("name"):
+        errors.append("agent.json has no name")
+    if not isinstance(data.get("capabilities"), dict):
+        errors.append("agent.json has no capabilities object")
+    return errors
+
+
+# ---------------------------------------------------------------------------
+# Fetching
+# ---------------------------------------------------------------------------
+
+def fetch(url: str, entry: dict, timeout: float):
+    """Blocking conditional GET. Returns (status, headers, body)."""
+    request = urllib.request.Request(url, headers={
+        "Accept": "application/json",
+        "User-Agent": "plaintext-crm-agent-discovery",
+    })
+    if entry.get("etag"):
+        request.add_header("If-None-Match", entry["etag"])
+    if entry.get("last_modified"):
+        request.add_header("If-Modified-Since", entry["last_modified"])
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, response.headers, response.read(MAX_BYTES + 1)
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, b""
+
+
+def update_entry(url: str, entry: dict, result, now: float) -> dict:
+    """Fold a fetch result (or exception) into a cache entry."""
+    entry = dict(entry or {}, url=url, checked_at=int(now))
+    if isinstance(result, Exception):
+        entry.update(status="error", error=str(result) or type(result).__name__,
+                     expires_at=int(now + ERROR_TTL))
+        return entry
+
+    status, headers, body = result
+    if status == 304 and entry.get("descriptor") is not None:
+        entry.update(status="ok", error=None, expires_at=int(now + ttl_from_headers(headers)))
+        return entry
+    if status != 200:
+        entry.update(status="error", error=f"HTTP {status}", expires_at=int(now + ERROR_TTL))
+        return entry
+    if len(body) > MAX_BYTES:
+        entry.update(status="error", error="agent.json larger than 1 MB", expires_at=int(now + ERROR_TTL))
+        return entry
+
+    try:
+        data = json.loads(body.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError):
+        data = None
+    problems = ["agent.json is not valid JSON"] if data is None else validate_descriptor(data)
+    if problems:
+        entry.update(status="error", error="; ".join(problems), expires_at=int(now + ERROR_TTL))
+        return entry
+
+    entry.update(
+        status="ok", error=None, descriptor=data, fetched_at=int(now),
+        etag=headers.get("ETag"), last_modified=headers.get("Last-Modified"),
+        expires_at=int(now + ttl_from_headers(headers)),
+    )
+    return entry
+
+
+async def refresh_all(urls: list[str], cache: dict, concurrency: int = DEFAULT_CONCURRENCY,
+                      timeout: float = DEFAULT_TIMEOUT, force: bool = False) -> dict:
+    """Refresh expired (or all, with force) descriptors concurrently.
+
+    Returns {url: "fetched" | "not_modified" | "error" | "fresh"}.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))  # 0 would block forever
+    now = time.time()
+    outcome = {}
+
+    async def refresh_one(url: str):
+        entry = cache.get(url, {})
+        if not force and is_fresh(entry, now):
+            outcome[url] = "fresh"
+            return
+        async with semaphore:
+            try:
+                result = await asyncio.to_thread(fetch, url, entry, timeout)
+            except Exception as e:  # network errors, timeouts, bad TLS
+                result = e
+        cache[url] = update_entry(url, entry, result, time.time())
+        if cache[url]["status"] != "ok":
+            outcome[url] = "error"
+        elif isinstance(result, tuple) and result[0] == 304:
+            outcome[url] = "not_modified"
+        else:
+            outcome[url] = "fetched"
+
+    await asyncio.gather(*(refresh_one(url) for url in urls))
+    return outcome
+
+
+# ---------------------------------------------------------------------------
+# Runtime lookups (cache only)
+# ---------------------------------------------------------------------------
+
+def agent_status(mcp_url: str, cache: dict = None) -> dict:
+    """Health of the cached descriptor for an mcp_url. No network.
+
+    status is "ok", "error" (last refresh failed; any descriptor is from an
+    earlier successful fetch) or "unknown" (never discovered).
+    """
+    cache = load_cache() if cache is None else cache
+    entry = cache.get(agent_json_url(mcp_url)) or {}
+    return {
+        "status": entry.get("status", "unknown"),
+        "error": entry.get("error"),
+        "fresh": entry.get("status") == "ok" and is_fresh(entry, time.time()),
+        "checked_at": entry.get("checked_at"),
+        "fetched_at": entry.get("fetched_at"),
+    }
+
+
+def capabilities(mcp_url: str, cache: dict = None) -> dict:
+    """Cached capabilities for an mcp_url; {} if never discovered. No network.
+
+    Returns the last good descriptor even if the latest refresh failed;
+    check agent_status() to tell a failing agent from a healthy one.
+    """
+    cache = load_cache() if cache is None else cache
+    entry = cache.get(agent_json_url(mcp_url)) or {}
+    descriptor = entry.get("descriptor") or {}
+    return descriptor.get("capabilities") or {}
+
+
+def tools(mcp_url: str, cache: dict = None) -> list[str]:
+    """All tool names advertised by the agent behind an mcp_url."""
+    return sorted({
+        tool
+        for capability in capabilities(mcp_url, cache).values()
+        if isinstance(capability, dict)
+        for tool in capability.get("tools", [])
+    })
+
+
+def positive_int(value: str) -> int:
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Discover and cache MCP agent descriptors")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("check", help="Validate mcp_url values")
+    refresh = sub.add_parser("refresh", help="Fetch expired agent.json descriptors")
+    refresh.add_argument("--force", action="store_true", help="Refetch even if not expired")
+    refresh.add_argument("--concurrency", type=positive_int, default=DEFAULT_CONCURRENCY,
+                         help=f"Max parallel requests (default: {DEFAULT_CONCURRENCY})")
+    refresh.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                         help=f"Per-request timeout in seconds (default: {DEFAULT_TIMEOUT})")
+    show = sub.add_parser("show", help="Show cached capabilities")
+    show.add_argument("ids", nargs="*", help="company_id / person_id to show (default: all)")
+    args = parser.parse_args()
+
+    targets, errors = collect_mcp_urls()
+    if errors:
+        print(f"{len(errors)} invalid mcp_url values:")
+        for e in errors:
+            print(f"     - {e}")
+
+    if args.command == "check":
+        if not errors:
+            print(f"{sum(len(v) for v in targets.values())} mcp_url values OK")
+        return min(len(errors), 1)
+
+    cache = load_cache()
+
+    if args.command == "refresh":
+        outcome = asyncio.run(refresh_all(list(targets), cache, args.concurrency, args.timeout, args.force))
+        save_cache(cache)
+        counts = {k: list(outcome.values()).count(k) for k in ("fetched", "not_modified", "fresh", "error")}
+        print(f"{len(outcome)} agents: {counts['fetched']} fetched, {counts['not_modified']} not modified, "
+              f"{counts['fresh']} still fresh, {counts['error']} errors")
+        for url, result in sorted(outcome.items()):
+            if result == "error":
+                print(f"     - {url}: {cache[url]['error']}")
+        return 1 if counts["error"] else 0
+
+    wanted = set(args.ids)
+    now = time.time()
+    for url, contacts in sorted(targets.items()):
+        for table, record_id, mcp_url in contacts:
+            if wanted and record_id not in wanted:
+                continue
+            entry = cache.get(url)
+            if not entry or entry.get("descriptor") is None:
+                state = "not discovered" if not entry else f"error: {entry.get('error')}"
+                print(f"{record_id} [{table}] {mcp_url}  ({state})")
+                continue
+            if entry.get("status") == "error":
+                note = f"  (last refresh failed: {entry.get('error')}; showing descriptor from an earlier fetch)"
+            elif not is_fresh(entry, now):
+                note = "  (stale, run refresh)"
+            else:
+                note = ""
+            print(f"{record_id} [{table}] {mcp_url}  {entry['descriptor'].get('name')}{note}")
+            for name in tools(mcp_url, cache):
+                print(f"     - {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Select and rank outreach candidates with their full context in one pass.
+
+Loads people, companies, leads and activities once, joins them, and streams a
+context bundle per contact -- company row, open leads, last N activities, last
+contact date and direction, and the OUTREACH_PROMPT.md scenario:
+
+    A      never contacted
+    B      last touch was ours (no response yet)
+    C      a lead with their company was lost (re-engage carefully)
+    reply  their message is the latest one -- we owe an answer
+
+Usage:
+    python3 scripts/outreach_candidates.py --stale-days 30
+    python3 scripts/outreach_candidates.py --stale-days 30 --product prod-labeling --limit 50
+    python3 scripts/outreach_candidates.py --industry Fintech --one-per-company --format jsonl > batch.jsonl
+"""
+
+import argparse
+import json
+import sys
+from datetime import date
+
+import pandas as pd
+
+from typed_loader import load_table
+
+
+OPEN_LEAD_STAGES = ["new", "qualified", "proposal", "negotiation"]
+PRIORITY_SCORE = {"critical": 4, "high": 3, "medium": 2, "low": 1}
+STAGE_SCORE = {"negotiation": 4, "proposal": 3, "qualified": 2, "new": 1}
+DEFAULT_HISTORY = 5
+
+
+def clean(value):
+    """Make a pandas value JSON-friendly."""
+    if value is None or (not isinstance(value, (list, dict)) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.strftime("%Y-%m-%d")
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def records(df, columns: list[str]) -> list[dict]:
+    columns = [c for c in columns if c in df.columns]
+    return [{k: clean(v) for k, v in row.items()} for row in df[columns].to_dict("records")]
+
+
+class OutreachContext:
+    """All tables needed for outreach, joined once and indexed by person/company."""
+
+    def __init__(self, history: int = DEFAULT_HISTORY, today: date = None):
+        self.today = pd.Timestamp(today or date.today())
+        self.people = load_table("people")
+        companies = load_table("companies")
+        leads = load_table("leads")
+        activities = load_table("activities")
+
+        self.companies = {}
+        if not companies.empty:
+            for row in records(companies, list(companies.columns)):
+                self.companies[row["company_id"]] = row
+
+        self.leads_by_company = {}
+        self.lost_companies = set()
+        if not leads.empty:
+            stage = leads["stage"].astype(str)
+            open_leads = leads[stage.isin(OPEN_LEAD_STAGES)]
+            for row in records(open_leads, [
+                "lead_id", "company_id", "product_id", "stage", "priority", "primary_contact_id",
+                "estimated_value", "currency", "next_action", "next_action_date", "notes",
+            ]):
+                self.leads_by_company.setdefault(row["company_id"], []).append(row)
+            self.lost_companies = set(leads.loc[stage == "lost", "company_id"].dropna().astype(str))
+
+        # Last N activities per person, newest first, plus last contact date/direction
+        self.history = {}
+        self.last_activity = {}
+        if not activities.empty and "person_id" in activities.columns:
+            # Unparseable dates can't be ordered; keep them out of "last contact"
+            acts = activities.dropna(subset=["person_id", "date"]).sort_values("date", kind="stable")
+            recent = acts.groupby("person_id", observed=True).tail(history)
+            for row in records(recent, ["person_id", "date", "type", "channel", "direction", "subject", "notes"]):
+                self.history.setdefault(row.pop("person_id"), []).insert(0, row)
+            last = acts.groupby("person_id", observed=True).tail(1)
+            for pid, when, direction in zip(last["person_id"], last["date"], last["direction"]):
+                self.last_activity[str(pid)] = (when, clean(direction))
+
+    def last_contact(self, person: dict):
+        """Latest of the last logged activity and people.last_contact."""
+        when, direction = self.last_activity.get(person["person_id"], (pd.NaT, None))
+        recorded = person.get("last_contact")
+        if pd.notna(recorded) and (pd.isna(when) or recorded > when):
+            return recorded, None  # contacted outside the activity log
+        return when, direction
+
+    def bundle(self, person: dict) -> dict:
+        """Full outreach context for one person (a people.csv row as a dict)."""
+        pid = person["person_id"]
+        cid = clean(person.get("company_id"))
+        company = self.companies.get(cid)
+        leads = [
+            lead for lead in self.leads_by_company.get(cid, [])
+            if lead["primary_contact_id"] in (None, pid)
+        ]
+        history = self.history.get(pid, [])
+        when, direction = self.last_contact(person)
+        days = None if pd.isna(when) else int((self.today - when).days)
+
+        if pd.isna(when):
+            scenario = "A"
+        elif cid in self.lost_companies and not leads:
+            scenario = "C"
+        elif direction == "inbound":
+            scenario = "reply"
+        else:
+            scenario = "B"
+
+        bundle = {
+            "person_id": pid,
+            "name": " ".join(str(p) for p in (clean(person.get("first_name")), clean(person.get("last_name"))) if p),
+            "role": clean(person.get("role")),
+            "email": clean(person.get("email")),
+            "telegram_username": clean(person.get("telegram_username")),
+            "linkedin_url": clean(person.get("linkedin_url")),
+            "company": company,
+            "open_leads": leads,
+            "history": history,
+            "last_contact_date": clean(when),
+            "last_direction": direction,
+            "days_since_contact": days,
+            "scenario": scenario,
+        }
+        bundle["score"] = score(bundle)
+        return bundle
+
+
+def score(bundle: dict) -> float:
+    """Higher first: hot leads, unanswered inbound messages, then staleness."""
+    lead_score = max(
+        (PRIORITY_SCORE.get(lead["priority"], 0) + STAGE_SCORE.get(lead["stage"], 0)
+         for lead in bundle["open_leads"]),
+        default=0,
+    )
+    days = bundle["days_since_contact"]
+    staleness = 1.0 if days is None else min(days, 180) / 180
+    reply_owed = 3 if bundle["scenario"] == "reply" else 0
+    re_engage = -2 if bundle["scenario"] == "C" else 0
+    return round(lead_score + reply_owed + re_engage + staleness, 3)
+
+
+def select_candidates(ctx: OutreachContext, stale_days: int = None, product: str = None,
+                      stage: str = None, industry: str = None, role: str = None,
+                      one_per_company: bool = False, limit: int = None):
+    """Yield ranked candidate bundles matching the filters."""
+    people = ctx.people
+    if people.empty:
+        return
+    if role:
+        people = people[people["role"].fillna("").str.contains(role, case=False, regex=False)]
+
+    bundles = []
+    for person in people.to_dict("records"):
+        if pd.isna(person.get("person_id")):
+            continue
+        b = ctx.bundle(person)
+        if stale_days is not None and b["days_since_contact"] is not None and b["days_since_contact"] < stale_days:
+            continue
+        if industry and (b["company"] or {}).get("industry", "") != industry:
+            continue
+        if product and not any(lead["product_id"] == product for lead in b["open_leads"]):
+            continue
+        if stage and not any(lead["stage"] == stage for lead in b["open_leads"]):
+            continue
+        bundles.append(b)
+
+    bundles.sort(key=lambda b: (-b["score"], b["person_id"]))
+    seen_companies = set()
+    emitted = 0
+    for b in bundles:
+        cid = (b["company"] or {}).get("company_id")
+        if one_per_company and cid:
+            if cid in seen_companies:
+                continue
+            seen_companies.add(cid)
+        yield b
+        emitted += 1
+        if limit and emitted >= limit:
+            return
+
+
+def format_text(b: dict) -> str:
+    company = b["company"] or {}
+    lines = [f"## {b['name']} -- {company.get('name', 'no company')}, {b['role'] or 'role unknown'}"]
+    lines.append(f"   {b['person_id']}  score {b['score']}  scenario {b['scenario']}  "
+                 f"last contact {b['last_contact_date'] or 'never'}"
+                 f"{' (' + b['last_direction'] + ')' if b['last_direction'] else ''}")
+    for lead in b["open_leads"]:
+        lines.append(f"   lead {lead['lead_id']}: {lead['stage']}, {lead['priority'] or '-'} -- {lead['next_action'] or ''}")
+    for act in b["history"]:
+        lines.append(f"   {act['date']} {act['direction'] or '':<8} {act['channel']:<9} {act['subject'] or ''}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Select and rank outreach candidates with context")
+    parser.add_argument("--stale-days", type=int, help="Only contacts not contacted in N days (or never)")
+    parser.add_argument("--product", help="Only contacts with an open lead for this product_id")
+    parser.add_argument("--stage", choices=OPEN_LEAD_STAGES, help="Only contacts with an open lead in this stage")
+    parser.add_argument("--industry", help="Only companies in this industry")
+    parser.add_argument("--role", help="Role contains this text (e.g. CEO, CTO)")
+    parser.add_argument("--one-per-company", action="store_true", help="Keep only the best contact per company")
+    parser.add_argument("--history", type=int, default=DEFAULT_HISTORY,
+                        help=f"Activities per contact (default: {DEFAULT_HISTORY})")
+    parser.add_argument("--limit", type=int, help="Max candidates")
+    parser.add_argument("--format", choices=["text", "jsonl"], default="text")
+    args = parser.parse_args()
+
+    ctx = OutreachContext(history=args.history)
+    count = 0
+    for b in select_candidates(ctx, args.stale_days, args.product, args.stage, args.industry,
+                               args.role, args.one_per_company, args.limit):
+        if args.format == "jsonl":
+            print(json.dumps(b, ensure_ascii=False, default=str))
+        else:
+            print(format_text(b) + "\n")
+        count += 1
+
+    if args.format == "text":
+        print(f"{count} candidates")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
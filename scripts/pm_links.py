@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Resolve and validate plaintext-pm links into the CRM in one batch.
+
+PM projects and tasks point into the CRM with:
+    crm_link_type + crm_link_id     e.g. company + comp-acme
+    crm_person_linkedin_url         matched against people.linkedin_url
+    crm_activity_id                 e.g. act-001
+
+A persisted secondary index (ID -> label, normalized linkedin_url -> person_id)
+is kept in <repo>/.crm_cache/link_index.json (or <crm-path>/.crm_cache when the
+CRM data is not at <repo>/sales/crm, or --cache-dir) and rebuilt per
+table only when that CSV changes, so thousands of links resolve with dict
+lookups instead of rescanning the CRM.
+
+Usage:
+    python3 scripts/pm_links.py ../plaintext-pm                 # Scan every PM CSV with crm_* columns
+    python3 scripts/pm_links.py ../plaintext-pm/tasks.csv --crm-path ../plaintext-crm/sales/crm
+    CRM_PATH=../plaintext-crm/sales/crm python3 ../plaintext-crm/scripts/pm_links.py .
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from crm_schema import CRM_DIR, atomic_write, file_stamp, table_spec
+from validate_csv import load_csv
+
+
+INDEX_VERSION = 1
+
+# crm_link_type -> CRM table
+LINK_TYPES = {
+    "company": "companies",
+    "person": "people",
+    "product": "products",
+    "lead": "leads",
+    "client": "clients",
+    "partner": "partners",
+    "deal": "deals",
+    "activity": "activities",
+}
+# Column shown as a human-readable label for resolved links
+LABEL_COLUMNS = {
+    "companies": ["name"],
+    "people": ["first_name", "last_name"],
+    "products": ["name"],
+    "leads": ["company_id", "stage"],
+    "clients": ["company_id", "status"],
+    "partners": ["company_id", "partnership_type"],
+    "deals": ["name", "stage"],
+    "activities": ["date", "subject"],
+}
+LINK_COLUMNS = ["crm_link_type", "crm_link_id", "crm_person_linkedin_url", "crm_activity_id"]
+
+
+def normalize_linkedin(url) -> str:
+    """'https://www.LinkedIn.com/in/john/?trk=x' -> 'linkedin.com/in/john'."""
+    s = str(url).strip().lower().split("?", 1)[0].split("#", 1)[0]
+    for prefix in ("https://", "http://"):
+        if s.startswith(prefix):
+            s = s[len(prefix):]
+    if s.startswith("www."):
+        s = s[4:]
+    return s.rstrip("/")
+
+
+def default_cache_dir(crm_path: Path) -> Path:
+    """<repo>/.crm_cache for a standard <repo>/sales/crm checkout, else inside crm_path."""
+    if crm_path.parts[-2:] == ("sales", "crm"):
+        return crm_path.parent.parent / ".crm_cache"
+    return crm_path / ".crm_cache"
+
+
+class LinkIndex:
+    """ID and linkedin_url lookups over one CRM checkout, persisted between runs."""
+
+    def __init__(self, crm_path: Path = CRM_DIR, cache_dir: Path = None):
+        self.crm_path = Path(crm_path).resolve()
+        self.index_path = Path(cache_dir or default_cache_dir(self.crm_path)) / "link_index.json"
+        self.data = self._load()
+        if self._refresh():
+            self._save()
+
+    def _load(self) -> dict:
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == INDEX_VERSION and data.get("crm_path") == str(self.crm_path):
+                    return data
+            except (OSError, ValueError):
+                pass
+        return {"version": INDEX_VERSION, "crm_path": str(self.crm_path),
+                "files": {}, "ids": {}, "linkedin": {}}
+
+    def _save(self) -> None:
+        try:
+            atomic_write(self.index_path, json.dumps(self.data).encode("utf-8"))
+        except OSError:
+            pass  # Derived data; rebuilt on the next run
+
+    def _refresh(self) -> bool:
+        changed = False
+        for table in LINK_TYPES.values():
+            spec = table_spec(table)
+            path = self.crm_path / spec["file"]
+            stamp = file_stamp(path)
+            if self.data["files"].get(table) == stamp:
+                continue
+
+            df = load_csv(path) if path.exists() else pd.DataFrame()
+            pk = spec["primary_key"]
+            ids = {}
+            if not df.empty and pk in df.columns:
+                label_cols = [c for c in LABEL_COLUMNS[table] if c in df.columns]
+                for row in df[[pk] + label_cols].itertuples(index=False, name=None):
+                    if pd.isna(row[0]):
+                        continue
+                    ids[str(row[0])] = " ".join(str(v) for v in row[1:] if pd.notna(v))
+            self.data["ids"][table] = ids
+
+            if table == "people":
+                linkedin = {}
+                if not df.empty and "linkedin_url" in df.columns:
+                    for pid, url in zip(df[pk], df["linkedin_url"]):
+                        if pd.notna(pid) and pd.notna(url) and str(url).strip():
+                            linkedin.setdefault(normalize_linkedin(url), str(pid))
+                self.data["linkedin"] = linkedin
+
+            self.data["files"][table] = stamp
+            changed = True
+        return changed
+
+    def resolve_id(self, link_type: str, value: str):
+        """Return (table, id, label) or an error string."""
+        table = LINK_TYPES.get(str(link_type).strip().lower())
+        if table is None:
+            return f"unknown crm_link_type '{link_type}'"
+        value = str(value).strip()
+        label = self.data["ids"].get(table, {}).get(value)
+        if label is None:
+            return f"{table} has no {value}"
+        return table, value, label
+
+    def resolve_linkedin(self, url: str):
+        pid = self.data["linkedin"].get(normalize_linkedin(url))
+        if pid is None:
+            return f"no person with linkedin_url {url}"
+        return "people", pid, self.data["ids"].get("people", {}).get(pid, "")
+
+    def resolve_row(self, row: dict) -> list[tuple]:
+        """Resolve every CRM link in one PM row: [(column, value, result)]."""
+        results = []
+
+        def present(column):
+            value = row.get(column)
+            return value is not None and not pd.isna(value) and str(value).strip()
+
+        if present("crm_link_id"):
+            link_type = row.get("crm_link_type") if present("crm_link_type") else "company"
+            results.append(("crm_link_id", row["crm_link_id"], self.resolve_id(link_type, row["crm_link_id"])))
+        if present("crm_person_linkedin_url"):
+            url = row["crm_person_linkedin_url"]
+            results.append(("crm_person_linkedin_url", url, self.resolve_linkedin(url)))
+        if present("crm_activity_id"):
+            aid = row["crm_activity_id"]
+            results.append(("crm_activity_id", aid, self.resolve_id("activity", aid)))
+        return results
+
+
+def pm_csv_files(paths: list[Path]) -> list[Path]:
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(p for p in sorted(path.rglob("*.csv")) if ".git" not in p.parts)
+        elif path.exists():
+            files.append(path)
+    return files
+
+
+def check_links(index: LinkIndex, files: list[Path]) -> tuple[int, list[str]]:
+    """Resolve every link in the given PM files. Returns (links checked, dangling)."""
+    checked = 0
+    dangling = []
+    for path in files:
+        df = load_csv(path)
+        columns = [c for c in LINK_COLUMNS if c in df.columns]
+        if df.empty or not columns:
+            continue
+        for i, row in enumerate(df[columns].to_dict("records")):
+            for column, value, result in index.resolve_row(row):
+                checked += 1
+                if isinstance(result, str):
+                    dangling.append(f"{path.name} row {i + 2}: {column} '{value}' -- {result}")
+    return checked, dangling
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate plaintext-pm links into the CRM")
+    parser.add_argument("paths", nargs="+", type=Path, help="PM CSV files or directories")
+    parser.add_argument("--crm-path", type=Path, default=Path(os.environ.get("CRM_PATH", CRM_DIR)),
+                        help="CRM data directory (default: $CRM_PATH or this repo's sales/crm)")
+    parser.add_argument("--cache-dir", type=Path,
+                        help="Where to keep link_index.json (default: <repo>/.crm_cache for "
+                             "a <repo>/sales/crm path, else <crm-path>/.crm_cache)")
+    args = parser.parse_args()
+
+    if not (args.crm_path / "schema.yaml").exists() and not (args.crm_path / "contacts").exists():
+        print(f"{args.crm_path} does not look like a CRM data directory")
+        return 1
+
+    index = LinkIndex(args.crm_path, args.cache_dir)
+    files = pm_csv_files(args.paths)
+    checked, dangling = check_links(index, files)
+
+    print("=" * 50)
+    print("PM -> CRM LINK REPORT")
+    print("=" * 50)
+    print(f"  Files scanned:  {len(files)}")
+    print(f"  Links checked:  {checked}")
+    print(f"  Dangling:       {len(dangling)}")
+    for line in dangling[:20]:
+        print(f"     - {line}")
+    if len(dangling) > 20:
+        print(f"     ... and {len(dangling) - 20} more")
+    return min(len(dangling), 1)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
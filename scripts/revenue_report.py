@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Currency-normalized pipeline and revenue aggregation.
+
+Converts every amount to one base currency with the dated rates in
+sales/crm/fx_rates.csv (rate = USD per 1 unit, the latest rate on or before
+the conversion date is used) and reports:
+
+    - lead pipeline value by stage          (leads.estimated_value, today's rate)
+    - deal value by stage                   (deals.value, today's rate)
+    - MRR per month                         (clients.mrr while the contract runs)
+    - collected revenue per month           (deals.paid_amount by paid_date)
+
+Per-row contributions are cached in .crm_cache/revenue.pickle. Each run only
+re-aggregates rows that changed since the last run, adjusting the group totals
+by the difference.
+
+Usage:
+    python3 scripts/revenue_report.py
+    python3 scripts/revenue_report.py --base EUR --months 6
+    python3 scripts/revenue_report.py --rebuild
+"""
+
+import argparse
+import hashlib
+import pickle
+import sys
+from bisect import bisect_right
+from datetime import date
+from functools import lru_cache
+
+import pandas as pd
+
+from crm_schema import CACHE_DIR, CRM_DIR, atomic_write, file_stamp, primary_key, table_path
+from typed_loader import load_table
+from validate_csv import load_csv
+
+
+FX_RATES_PATH = CRM_DIR / "fx_rates.csv"
+CACHE_PATH = CACHE_DIR / "revenue.pickle"
+CACHE_VERSION = 3
+
+AGGREGATED_TABLES = ["leads", "clients", "deals"]
+OPEN_LEAD_STAGES = {"new", "qualified", "proposal", "negotiation"}
+
+
+# ---------------------------------------------------------------------------
+# FX rates
+# ---------------------------------------------------------------------------
+
+class FxRates:
+    """Dated FX table with a cached 'latest rate on or before' lookup."""
+
+    def __init__(self, path=FX_RATES_PATH):
+        self.rates = {}
+        df = load_csv(path) if path.exists() else pd.DataFrame()
+        if not df.empty:
+            df = df.dropna(subset=["date", "currency", "rate"]).sort_values("date")
+            for currency, group in df.groupby("currency"):
+                self.rates[str(currency).upper()] = (
+                    group["date"].astype(str).tolist(),
+                    group["rate"].astype(float).tolist(),
+                )
+        self.usd_rate = lru_cache(maxsize=None)(self._usd_rate)
+
+    def _usd_rate(self, currency: str, on: str):
+        if currency == "USD":
+            return 1.0
+        if currency not in self.rates:
+            return None
+        dates, rates = self.rates[currency]
+        i = bisect_right(dates, on) - 1
+        if i < 0:
+            return None  # before the first known rate
+        return rates[i]
+
+    def convert(self, amount: float, currency: str, base: str, on: str):
+        """Convert amount to base currency at the rate for `on` (YYYY-MM-DD)."""
+        src = self.usd_rate(currency, on)
+        dst = self.usd_rate(base, on)
+        if src is None or dst is None:
+            return None
+        return amount * src / dst
+
+
+# ---------------------------------------------------------------------------
+# Row contributions: [(group, key, amount, currency, conversion date)]
+# ---------------------------------------------------------------------------
+
+def month_of(value) -> str:
+    return value.strftime("%Y-%m")
+
+
+def months_between(start: str, end: str) -> list[str]:
+    return [p.strftime("%Y-%m") for p in pd.period_range(start, end, freq="M")]
+
+
+def amount_of(row, column: str):
+    amount = row.get(column)
+    return None if pd.isna(amount) else float(amount)
+
+
+def currency_of(row) -> str:
+    currency = row.get("currency")
+    return "" if pd.isna(currency) else str(currency).strip().upper()
+
+
+def lead_contributions(row, today: str) -> list[tuple]:
+    stage = row.get("stage")
+    amount = amount_of(row, "estimated_value")
+    if amount is None or pd.isna(stage) or str(stage) not in OPEN_LEAD_STAGES:
+        return []
+    return [("pipeline", str(stage), amount, currency_of(row), today)]
+
+
+def deal_contributions(row, today: str) -> list[tuple]:
+    out = []
+    stage = row.get("stage")
+    amount = amount_of(row, "value")
+    currency = currency_of(row)
+    if amount is not None and pd.notna(stage):
+        out.append(("deals", str(stage), amount, currency, today))
+
+    paid_date = row.get("paid_date")
+    if pd.notna(paid_date):
+        paid = amount_of(row, "paid_amount")
+        if paid is None and str(stage) == "paid":
+            paid = amount
+        if paid is not None:
+            on = paid_date.strftime("%Y-%m-%d")
+            out.append(("collected", month_of(paid_date), paid, currency, on))
+    return out
+
+
+def client_contributions(row, today: str) -> list[tuple]:
+    amount = amount_of(row, "mrr")
+    currency = currency_of(row)
+    start = row.get("contract_start")
+    if pd.isna(start):
+        start = row.get("created_date")
+    if amount is None or pd.isna(start):
+        return []
+
+    end = row.get("contract_end")
+    if str(row.get("status")) == "churned" and pd.isna(end):
+        end = row.get("last_updated")
+    last_month = today[:7] if pd.isna(end) else min(month_of(end), today[:7])
+
+    return [("mrr", month, amount, currency, f"{month}-01")
+            for month in months_between(month_of(start), last_month)]
+
+
+CONTRIBUTIONS = {
+    "leads": lead_contributions,
+    "clients": client_contributions,
+    "deals": deal_contributions,
+}
+
+
+# ---------------------------------------------------------------------------
+# Aggregator
+# ---------------------------------------------------------------------------
+
+class RevenueAggregator:
+    """Group totals kept in sync with per-row contributions.
+
+    update_table() diffs a table against the cached row hashes and only
+    subtracts/adds the contributions of rows that changed.
+    """
+
+    def __init__(self, base: str, fx: FxRates, today: str):
+        self.base = base
+        self.fx = fx
+        self.today = today
+        self.totals = {"pipeline": {}, "deals": {}, "mrr": {}, "collected": {}}
+        self.rows = {}        # (table, pk) -> (row hash, contributions)
+        self.files = {}       # table -> [mtime_ns, size]
+        self.unconverted = {}  # (table, pk) -> [(group, key, reason)] left out of the totals
+
+    def convert(self, amount: float, currency: str, on: str):
+        if not currency:
+            return None
+        return self.fx.convert(amount, currency, self.base, on)
+
+    def skip_reason(self, currency: str, on: str) -> str:
+        """Why convert() returned None for this currency and date."""
+        if not currency:
+            return "no currency"
+        for code in (currency, self.base):
+            if code == "USD":
+                continue
+            if code not in self.fx.rates:
+                return f"no {code} rate"
+            if on < self.fx.rates[code][0][0]:
+                return f"no {code} rate on or before {on}"
+        return "no FX rate"
+
+    def _apply(self, contributions: list[tuple], sign: int) -> None:
+        for group, key, value in contributions:
+            totals = self.totals[group]
+            totals[key] = totals.get(key, 0.0) + sign * value
+            if abs(totals[key]) < 1e-9:
+                del totals[key]
+
+    def update_row(self, table: str, pk: str, row: dict) -> bool:
+        """Apply one inserted or changed row. Returns True if totals changed."""
+        key = (table, pk)
+        row_hash = hashlib.sha1(repr(sorted(row.items())).encode("utf-8")).hexdigest()
+        cached = self.rows.get(key)
+        if cached and cached[0] == row_hash:
+            return False
+        if cached:
+            self._apply(cached[1], -1)
+
+        # Amounts that can't be converted are left out one by one, so a
+        # missing early rate only drops those months, not the whole row
+        contributions = []
+        skipped = []
+        for group, group_key, amount, currency, on in CONTRIBUTIONS[table](row, self.today):
+            value = self.convert(amount, currency, on)
+            if value is None:
+                skipped.append((group, group_key, self.skip_reason(currency, on)))
+            else:
+                contributions.append((group, group_key, value))
+        if skipped:
+            self.unconverted[key] = skipped
+        else:
+            self.unconverted.pop(key, None)
+        self._apply(contributions, +1)
+        self.rows[key] = (row_hash, contributions)
+        return True
+
+    def remove_row(self, table: str, pk: str) -> None:
+        key = (table, pk)
+        cached = self.rows.pop(key, None)
+        if cached:
+            self._apply(cached[1], -1)
+        self.unconverted.pop(key, None)
+
+    def update_table(self, table: str) -> bool:
+        """Sync one table with its CSV file. Returns True if anything changed."""
+        path = table_path(table)
+        stamp = file_stamp(path)
+        if self.files.get(table) == stamp:
+            return False
+
+        pk = primary_key(table)
+        df = load_table(table) if path.exists() else pd.DataFrame()
+        current = set()
+        if not df.empty and pk in df.columns:
+            for row in df.to_dict("records"):
+                if pd.isna(row.get(pk)):
+                    continue
+                current.add(str(row[pk]))
+                self.update_row(table, str(row[pk]), row)
+
+        for key in [k for k in self.rows if k[0] == table and k[1] not in current]:
+            self.remove_row(*key)
+
+        self.files[table] = stamp
+        return True
+
+    def refresh(self) -> bool:
+        changed = False
+        for table in AGGREGATED_TABLES:
+            changed |= self.update_table(table)
+        return changed
+
+
+STATE_ATTRS = ("totals", "rows", "files", "unconverted")
+
+
+def load_aggregator(base: str, today: str, rebuild: bool = False) -> RevenueAggregator:
+    """Restore the cached aggregator if it is still valid, then bring it up to date.
+
+    A different base currency, FX file or current day invalidates the cache,
+    since converted amounts (and open-ended MRR) depend on them.
+    """
+    aggregator = RevenueAggregator(base, FxRates(), today)
+    key = (CACHE_VERSION, base, file_stamp(FX_RATES_PATH), today)
+
+    restored = False
+    if not rebuild and CACHE_PATH.exists():
+        try:
+            with open(CACHE_PATH, "rb") as f:
+                cached = pickle.load(f)
+            if cached.get("key") == key:
+                for attr in STATE_ATTRS:
+                    setattr(aggregator, attr, cached[attr])
+                restored = True
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError):
+            pass
+
+    if aggregator.refresh() or not restored:
+        state = {attr: getattr(aggregator, attr) for attr in STATE_ATTRS}
+        state["key"] = key
+        try:
+            atomic_write(CACHE_PATH, pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError:
+            pass  # Derived data; recomputed on the next run
+    return aggregator
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+def print_group(title: str, totals: dict, base: str, order: list = None) -> None:
+    print(f"\n{title}")
+    keys = [k for k in order if k in totals] if order else sorted(totals)
+    if not keys:
+        print("  (none)")
+        return
+    for key in keys:
+        print(f"  {key:<14}{totals[key]:>14,.2f} {base}")
+    print(f"  {'total':<14}{sum(totals[k] for k in keys):>14,.2f} {base}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Currency-normalized pipeline and revenue report")
+    parser.add_argument("--base", default="USD", help="Base currency (default: USD)")
+    parser.add_argument("--months", type=int, default=12, help="Months of history to show (default: 12)")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the cache and re-aggregate everything")
+    args = parser.parse_args()
+
+    base = args.base.upper()
+    aggregator = load_aggregator(base, date.today().strftime("%Y-%m-%d"), args.rebuild)
+    if base != "USD" and base not in aggregator.fx.rates:
+        print(f"No FX rate for base currency {base} in {FX_RATES_PATH.name}")
+        return 1
+
+    print("=" * 50)
+    print(f"REVENUE REPORT ({base})")
+    print("=" * 50)
+
+    totals = aggregator.totals
+    print_group("Lead pipeline by stage", totals["pipeline"], base,
+                ["new", "qualified", "proposal", "negotiation"])
+    print_group("Deals by stage", totals["deals"], base,
+                ["proposal", "negotiation", "won", "in_progress", "delivered", "invoiced", "paid", "lost"])
+
+    recent = sorted(set(totals["mrr"]) | set(totals["collected"]))[-args.months:]
+    print(f"\n{'month':<10}{'MRR':>16}{'collected':>16}")
+    for month in recent:
+        print(f"{month:<10}{totals['mrr'].get(month, 0.0):>16,.2f}"
+              f"{totals['collected'].get(month, 0.0):>16,.2f}")
+
+    if aggregator.unconverted:
+        skipped = [
+            f"{table}/{pk} {group} {group_key}: {reason}"
+            for (table, pk), entries in sorted(aggregator.unconverted.items())
+            for group, group_key, reason in entries
+        ]
+        print(f"\n{len(skipped)} amounts in {len(aggregator.unconverted)} rows skipped (no FX rate or currency):")
+        for line in skipped[:10]:
+            print(f"     - {line}")
+        if len(skipped) > 10:
+            print(f"     ... and {len(skipped) - 10} more")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Ranked full-text search over CRM notes, subjects and descriptions.
+
+Keeps an inverted index in .crm_cache/search_index.pickle. Each run stats the
+CSV files and re-indexes only rows whose text changed, so searches after the
+first build take milliseconds instead of scanning every text column.
+
+Usage:
+    python3 scripts/search_crm.py "500k images"
+    python3 scripts/search_crm.py "hipaa contract" --table activities --limit 5
+    python3 scripts/search_crm.py --rebuild  # Drop the index and build from scratch
+"""
+
+import argparse
+import hashlib
+import math
+import pickle
+import re
+import sys
+
+import pandas as pd
+
+from crm_schema import CACHE_DIR, atomic_write, file_stamp, primary_key, table_path
+from validate_csv import load_csv
+
+
+INDEX_PATH = CACHE_DIR / "search_index.pickle"
+INDEX_VERSION = 1
+
+# Text columns indexed per table
+SEARCH_FIELDS = {
+    "companies": ["name", "description"],
+    "people": ["role", "notes"],
+    "leads": ["next_action", "notes"],
+    "clients": ["notes"],
+    "partners": ["notes"],
+    "deals": ["name", "notes"],
+    "activities": ["subject", "notes"],
+}
+# Matches in short headline fields count more than matches in long notes
+FIELD_WEIGHTS = {"name": 2.0, "subject": 2.0}
+
+PREVIEW_LENGTH = 120
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.'][a-z0-9]+)*")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have",
+    "in", "is", "it", "of", "on", "or", "that", "the", "their", "this", "to",
+    "was", "we", "were", "will", "with",
+}
+# (suffix, replacement), longest first; applied once per word
+SUFFIX_RULES = [
+    ("ational", "ate"), ("ization", "ize"), ("fulness", "ful"), ("iveness", "ive"),
+    ("ations", "ate"), ("ation", "ate"), ("ments", "ment"), ("ness", ""),
+    ("sses", "ss"), ("ies", "y"), ("ing", ""), ("ers", "er"), ("ed", ""),
+    ("ly", ""), ("es", "e"), ("s", ""),
+]
+
+
+def stem(word: str) -> str:
+    """Light suffix-stripping stemmer: 'images', 'imaging', 'image' -> 'imag'."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    for suffix, replacement in SUFFIX_RULES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            if suffix == "s" and word.endswith(("ss", "us", "is")):
+                break
+            word = word[: -len(suffix)] + replacement
+            break
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase, split into words, drop stopwords and stem."""
+    return [
+        stem(token.replace("'", ""))
+        for token in TOKEN_PATTERN.findall(str(text).lower())
+        if token not in STOPWORDS
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Index maintenance
+# ---------------------------------------------------------------------------
+
+def empty_index() -> dict:
+    return {
+        "version": INDEX_VERSION,
+        "files": {},       # table -> [mtime_ns, size] at last refresh
+        "docs": {},        # (table, pk) -> {"hash", "length", "terms", "preview"}
+        "postings": {},    # term -> {(table, pk): weighted term frequency}
+        "total_length": 0,
+    }
+
+
+def load_index() -> dict:
+    if INDEX_PATH.exists():
+        try:
+            with open(INDEX_PATH, "rb") as f:
+                index = pickle.load(f)
+            if index.get("version") == INDEX_VERSION:
+                return index
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+    return empty_index()
+
+
+def save_index(index: dict) -> None:
+    try:
+        atomic_write(INDEX_PATH, pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError:
+        pass  # The index is derived data; it is rebuilt on the next run
+
+
+def remove_doc(index: dict, key: tuple) -> None:
+    doc = index["docs"].pop(key)
+    index["total_length"] -= doc["length"]
+    for term in doc["terms"]:
+        postings = index["postings"].get(term)
+        if postings is None:
+            continue
+        postings.pop(key, None)
+        if not postings:
+            del index["postings"][term]
+
+
+def add_doc(index: dict, key: tuple, fields: dict, text_hash: str) -> None:
+    frequencies = {}
+    length = 0
+    for field, text in fields.items():
+        weight = FIELD_WEIGHTS.get(field, 1.0)
+        for term in tokenize(text):
+            frequencies[term] = frequencies.get(term, 0.0) + weight
+            length += 1
+    for term, tf in frequencies.items():
+        index["postings"].setdefault(term, {})[key] = tf
+    preview = " | ".join(t for t in fields.values() if t)
+    index["docs"][key] = {
+        "hash": text_hash,
+        "length": length,
+        "terms": list(frequencies),
+        "preview": preview[:PREVIEW_LENGTH],
+    }
+    index["total_length"] += length
+
+
+def refresh_table(index: dict, table: str) -> bool:
+    """Re-index changed rows of one table. Returns True if the index changed."""
+    path = table_path(table)
+    stamp = file_stamp(path)
+    if index["files"].get(table) == stamp:
+        return False
+
+    pk = primary_key(table)
+    fields = SEARCH_FIELDS[table]
+    df = load_csv(path) if path.exists() else pd.DataFrame()
+    current = set()
+
+    if not df.empty and pk in df.columns:
+        columns = [pk] + [f for f in fields if f in df.columns]
+        for row in df[columns].itertuples(index=False, name=None):
+            if pd.isna(row[0]):
+                continue
+            key = (table, str(row[0]))
+            current.add(key)
+            texts = {
+                field: "" if pd.isna(value) else str(value)
+                for field, value in zip(columns[1:], row[1:])
+            }
+            text_hash = hashlib.sha1("\x1f".join(texts.values()).encode("utf-8")).hexdigest()
+            existing = index["docs"].get(key)
+            if existing is not None:
+                if existing["hash"] == text_hash:
+                    continue
+                remove_doc(index, key)
+            add_doc(index, key, texts, text_hash)
+
+    stale = [key for key in index["docs"] if key[0] == table and key not in current]
+    for key in stale:
+        remove_doc(index, key)
+
+    index["files"][table] = stamp
+    return True
+
+
+def refresh_index(index: dict = None) -> dict:
+    """Bring the index up to date with the CSV files and persist it if it changed."""
+    if index is None:
+        index = load_index()
+    changed = False
+    for table in SEARCH_FIELDS:
+        changed |= refresh_table(index, table)
+    if changed:
+        save_index(index)
+    return index
+
+
+# ---------------------------------------------------------------------------
+# Search
+# ---------------------------------------------------------------------------
+
+def search(index: dict, query: str, tables: set = None, limit: int = 10) -> list[tuple]:
+    """BM25-ranked search. Returns [(score, table, pk, preview)] best first."""
+    terms = set(tokenize(query))
+    n_docs = len(index["docs"])
+    if not terms or not n_docs:
+        return []
+    avg_length = index["total_length"] / n_docs or 1.0
+
+    scores = {}
+    for term in terms:
+        postings = index["postings"].get(term)
+        if not postings:
+            continue
+        idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+        for key, tf in postings.items():
+            if tables and key[0] not in tables:
+                continue
+            length = index["docs"][key]["length"]
+            norm = tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+            scores[key] = scores.get(key, 0.0) + idf * norm
+
+    ranked = sorted(scores.items(), key=lambda kv: -kv[1])[:limit]
+    return [(score, key[0], key[1], index["docs"][key]["preview"]) for key, score in ranked]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search CRM notes, subjects and descriptions")
+    parser.add_argument("query", nargs="?", help="Search words")
+    parser.add_argument("--table", action="append", choices=sorted(SEARCH_FIELDS),
+                        help="Restrict to a table (repeatable)")
+    parser.add_argument("--limit", type=int, default=10, help="Max results (default: 10)")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index from scratch")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        index = refresh_index(empty_index())
+        print(f"Indexed {len(index['docs'])} records, {len(index['postings'])} terms")
+        if not args.query:
+            return 0
+    elif not args.query:
+        parser.error("query is required unless --rebuild is given")
+    else:
+        index = refresh_index()
+
+    results = search(index, args.query, set(args.table or []), args.limit)
+    if not results:
+        print("No matches")
+        return 1
+    for score, table, pk, preview in results:
+        print(f"{score:6.2f}  {table}/{pk}")
+        print(f"        {preview}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
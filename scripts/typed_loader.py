@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Memory-compact, typed loading of CRM tables driven by schema.yaml.
+
+    enums        -> category (declared values first, unknown values kept)
+    foreign keys -> category (few distinct IDs repeated across many rows)
+    primary key  -> Arrow-backed string if pyarrow is installed
+    dates        -> datetime64 (unparseable values become NaT)
+    numeric      -> nullable Float64 (unparseable values become <NA>)
+
+Usage:
+    python3 scripts/typed_loader.py                 # Memory benchmark vs load_csv
+    python3 scripts/typed_loader.py --scale 10000   # Benchmark on tables replicated to N rows
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from crm_schema import table_names, table_path, table_spec
+from validate_csv import load_csv
+
+try:
+    import pyarrow  # noqa: F401
+    ID_DTYPE = "string[pyarrow]"
+except ImportError:
+    ID_DTYPE = "string"
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def column_dtypes(table: str) -> dict:
+    """Map column -> dtype for read_csv from the table's schema entry."""
+    spec = table_spec(table)
+    dtypes = {spec["primary_key"]: ID_DTYPE}
+    for col in spec.get("foreign_keys", {}):
+        dtypes[col] = "category"
+    for col in spec.get("enums", {}):
+        dtypes[col] = "category"
+    for col in spec.get("numeric", []) + spec.get("dates", []):
+        dtypes[col] = "string"
+    return dtypes
+
+
+def load_table(table: str, path: Path = None) -> pd.DataFrame:
+    """Load a CRM table with compact, schema-derived dtypes."""
+    spec = table_spec(table)
+    path = path or table_path(table)
+
+    try:
+        header = pd.read_csv(path, nrows=0).columns
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
+    dtypes = {col: dtype for col, dtype in column_dtypes(table).items() if col in header}
+
+    df = pd.read_csv(path, dtype=dtypes)
+
+    for col in spec.get("dates", []):
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], format=DATE_FORMAT, errors="coerce")
+
+    for col in spec.get("numeric", []):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Float64")
+
+    for col, values in spec.get("enums", {}).items():
+        if col in df.columns:
+            extra = [c for c in df[col].cat.categories if c not in values]
+            df[col] = df[col].cat.set_categories(list(values) + extra)
+
+    return df
+
+
+def load_tables(tables: list[str] = None) -> dict:
+    """Load several tables at once: {table: DataFrame}."""
+    return {table: load_table(table) for table in tables or table_names()}
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def memory_bytes(df) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+def replicate(path: Path, rows: int, tmp_dir: Path) -> Path:
+    """Write a copy of a CSV with its rows repeated up to `rows` rows."""
+    df = load_csv(path)
+    if df.empty:
+        return path
+    reps = -(-rows // len(df))
+    big = pd.concat([df] * reps, ignore_index=True).head(rows)
+    out = tmp_dir / path.name
+    big.to_csv(out, index=False)
+    return out
+
+
+def benchmark(scale: int = 0) -> list[tuple]:
+    """Return [(table, rows, file_bytes, default_bytes, typed_bytes, default_s, typed_s)]."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for table in table_names():
+            path = table_path(table)
+            if not path.exists():
+                continue
+            if scale:
+                path = replicate(path, scale, Path(tmp))
+
+            start = time.perf_counter()
+            default_df = load_csv(path)
+            default_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            typed_df = load_table(table, path)
+            typed_s = time.perf_counter() - start
+
+            results.append((
+                table, len(typed_df), path.stat().st_size,
+                memory_bytes(default_df), memory_bytes(typed_df), default_s, typed_s,
+            ))
+    return results
+
+
+def format_bytes(n: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark typed CRM loading against load_csv")
+    parser.add_argument("--scale", type=int, default=0,
+                        help="Replicate each table to N rows before measuring")
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print(f"TYPED LOADING BENCHMARK (id dtype: {ID_DTYPE})")
+    print("=" * 78)
+    print(f"{'table':<12}{'rows':>9}{'file':>10}{'load_csv':>11}{'typed':>10}{'ratio':>8}"
+          f"{'load_csv s':>11}{'typed s':>9}")
+
+    total_default = total_typed = 0
+    for table, rows, size, default_b, typed_b, default_s, typed_s in benchmark(args.scale):
+        total_default += default_b
+        total_typed += typed_b
+        print(f"{table:<12}{rows:>9}{format_bytes(size):>10}{format_bytes(default_b):>11}"
+              f"{format_bytes(typed_b):>10}{default_b / max(typed_b, 1):>7.1f}x"
+              f"{default_s:>11.3f}{typed_s:>9.3f}")
+
+    print("-" * 78)
+    print(f"Total: {format_bytes(total_default)} -> {format_bytes(total_typed)} "
+          f"({total_default / max(total_typed, 1):.1f}x smaller)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,19 +5,26 @@ Validate CRM CSV files for common issues.
 Usage:
     python3 scripts/validate_csv.py
     python3 scripts/validate_csv.py --fix  # Auto-fix missing last_updated
+    python3 scripts/validate_csv.py --no-cache  # Re-run every check
+
+Results are cached per table in .crm_cache/validation.json, keyed by the
+content hash of the table and of every table it references through
+foreign_keys in schema.yaml. Unchanged files are recognised by mtime and
+size before falling back to hashing.
 """
 
 import argparse
+import hashlib
+import json
 import re
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 
 import pandas as pd
 
-
-BASE_DIR = Path(__file__).resolve().parent.parent
-CRM_DIR = BASE_DIR / "sales" / "crm"
+from crm_schema import CACHE_DIR, CRM_DIR, atomic_write, file_stamp, load_schema, table_path
 
 
 FORMULA_INJECTION_CHARS = {"=", "+", "-", "@", "\t", "\r"}
@@ -45,6 +52,12 @@ DATE_FIELDS = {
 }
 DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
 
+# Tables checked by this script, in report order
+CSV_FILES = {
+    table: table_path(table)
+    for table in ["companies", "people", "products", "leads", "clients", "partners", "deals", "activities"]
+}
+
 # Email format from schema.yaml
 EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
 
@@ -739,6 +752,84 @@ def validate_deals(fix: bool = False) -> list[str]:
     return errors
 
 
+class ValidationCache:
+    """Per-table validation results keyed by file content hashes.
+
+    A table's key covers its own CSV, the CSVs it references through
+    foreign_keys in schema.yaml, and this script itself, so editing either
+    the data or the rules invalidates it. File hashes are reused while a
+    file's [mtime_ns, size] is unchanged.
+    """
+
+    VERSION = 1
+    # mtime granularity: a file stamped this close to when it was hashed may
+    # have been rewritten within the same tick, so its stamp is not trusted
+    RACY_NS = 2_000_000_000
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.path = CACHE_DIR / "validation.json"
+        self.dirty = False
+        self.data = {"version": self.VERSION, "files": {}, "results": {}}
+        if enabled and self.path.exists():
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == self.VERSION:
+                    self.data = data
+            except (OSError, ValueError):
+                pass
+
+        self.dependencies = {
+            table: sorted({target.split(".", 1)[0] for target in (spec.get("foreign_keys") or {}).values()})
+            for table, spec in load_schema()["tables"].items()
+        }
+
+    def file_hash(self, path: Path) -> str:
+        stamp = file_stamp(path)
+        if stamp is None:
+            return "missing"
+        entry = self.data["files"].get(str(path))
+        if entry and entry["stamp"] == stamp and entry["hashed_at"] - stamp[0] > self.RACY_NS:
+            return entry["sha"]
+        sha = hashlib.sha256(path.read_bytes()).hexdigest()
+        self.data["files"][str(path)] = {"stamp": stamp, "sha": sha, "hashed_at": time.time_ns()}
+        self.dirty = True
+        return sha
+
+    def key(self, check: str, table: str) -> str:
+        tables = [table] + self.dependencies.get(table, []) if check == "table" else [table]
+        parts = [str(self.VERSION), self.file_hash(Path(__file__).resolve())]
+        parts += [f"{t}={self.file_hash(CSV_FILES[t])}" for t in tables if t in CSV_FILES]
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    def run(self, check: str, table: str, validate) -> list[str]:
+        """Return cached errors for (check, table), or run validate() and store them."""
+        if not self.enabled:
+            return validate()
+        name = f"{check}:{table}"
+        try:
+            key = self.key(check, table)
+        except OSError:
+            return validate()  # file changing underneath us: just validate, don't cache
+        cached = self.data["results"].get(name)
+        if cached and cached["key"] == key:
+            return cached["errors"]
+        errors = validate()
+        self.data["results"][name] = {"key": key, "errors": errors}
+        self.dirty = True
+        return errors
+
+    def save(self) -> None:
+        """Persist the cache. Never fails: a lost write only costs a re-run."""
+        if not (self.enabled and self.dirty):
+            return
+        try:
+            atomic_write(self.path, json.dumps(self.data).encode("utf-8"))
+        except OSError:
+            pass
+
+
 def print_errors(table_name: str, errors: list[str]) -> None:
     """Print validation errors for a table."""
     if errors:
@@ -754,6 +845,7 @@ def print_errors(table_name: str, errors: list[str]) -> None:
 def main():
     parser = argparse.ArgumentParser(description="Validate CRM CSV files")
     parser.add_argument("--fix", action="store_true", help="Auto-fix missing last_updated")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached results and re-run every check")
     args = parser.parse_args()
 
     print("=" * 50)
@@ -762,78 +854,42 @@ def main():
 
     all_errors = []
 
-    # Load companies for FK validation
-    companies_path = CRM_DIR / "contacts" / "companies.csv"
-    companies_df = load_csv(companies_path) if companies_path.exists() else pd.DataFrame()
-
-    # Collect all DataFrames for formula injection check
-    csv_files = {
-        "companies": CRM_DIR / "contacts" / "companies.csv",
-        "people": CRM_DIR / "contacts" / "people.csv",
-        "products": CRM_DIR / "products.csv",
-        "leads": CRM_DIR / "relationships" / "leads.csv",
-        "clients": CRM_DIR / "relationships" / "clients.csv",
-        "partners": CRM_DIR / "relationships" / "partners.csv",
-        "deals": CRM_DIR / "relationships" / "deals.csv",
-        "activities": CRM_DIR / "activities.csv",
-    }
-
-    # Companies
-    print("\nValidating companies...")
-    errors = validate_companies(fix=args.fix)
-    print_errors("companies", errors)
-    all_errors.extend(errors)
-
-    # People
-    print("\nValidating people...")
-    errors = validate_people(fix=args.fix)
-    print_errors("people", errors)
-    all_errors.extend(errors)
-
-    # Products
-    print("\nValidating products...")
-    errors = validate_products(fix=args.fix)
-    print_errors("products", errors)
-    all_errors.extend(errors)
-
-    # Activities
-    print("\nValidating activities...")
-    errors = validate_activities()
-    print_errors("activities", errors)
-    all_errors.extend(errors)
-
-    # Leads
-    print("\nValidating leads...")
-    errors = validate_leads(companies_df)
-    print_errors("leads", errors)
-    all_errors.extend(errors)
-
-    # Clients
-    print("\nValidating clients...")
-    errors = validate_clients(companies_df, fix=args.fix)
-    print_errors("clients", errors)
-    all_errors.extend(errors)
-
-    # Partners
-    print("\nValidating partners...")
-    errors = validate_partners(companies_df, fix=args.fix)
-    print_errors("partners", errors)
-    all_errors.extend(errors)
-
-    # Deals
-    print("\nValidating deals...")
-    errors = validate_deals(fix=args.fix)
-    print_errors("deals", errors)
-    all_errors.extend(errors)
+    # --fix rewrites files, so its results never come from (or go to) the cache
+    cache = ValidationCache(enabled=not (args.fix or args.no_cache))
+
+    # Companies for FK validation, loaded only if a dependent table is re-checked
+    loaded = {}
+
+    def companies_df():
+        if "companies" not in loaded:
+            path = CSV_FILES["companies"]
+            loaded["companies"] = load_csv(path) if path.exists() else pd.DataFrame()
+        return loaded["companies"]
+
+    validators = [
+        ("companies", lambda: validate_companies(fix=args.fix)),
+        ("people", lambda: validate_people(fix=args.fix)),
+        ("products", lambda: validate_products(fix=args.fix)),
+        ("activities", validate_activities),
+        ("leads", lambda: validate_leads(companies_df())),
+        ("clients", lambda: validate_clients(companies_df(), fix=args.fix)),
+        ("partners", lambda: validate_partners(companies_df(), fix=args.fix)),
+        ("deals", lambda: validate_deals(fix=args.fix)),
+    ]
+    for table_name, validate in validators:
+        print(f"\nValidating {table_name}...")
+        errors = cache.run("table", table_name, validate)
+        print_errors(table_name, errors)
+        all_errors.extend(errors)
 
     # CSV formula injection check (all tables)
     print("\nChecking for CSV formula injection...")
     injection_errors = []
-    for table_name, path in csv_files.items():
-        if path.exists():
-            df = load_csv(path)
-            if not df.empty:
-                injection_errors.extend(check_formula_injection(df, table_name))
+    for table_name, path in CSV_FILES.items():
+        def check(path=path, table_name=table_name):
+            df = load_csv(path) if path.exists() else pd.DataFrame()
+            return check_formula_injection(df, table_name) if not df.empty else []
+        injection_errors.extend(cache.run("formula_injection", table_name, check))
     if injection_errors:
         print(f"  {len(injection_errors)} issues:")
         for e in injection_errors[:5]:
@@ -843,6 +899,7 @@ def main():
     else:
         print("  OK")
     all_errors.extend(injection_errors)
+    cache.save()
 
     # Summary
     print("\n" + "=" * 50)